@@ -2,8 +2,9 @@
 """
 
 import polars as pl
-from os import system
+from io import StringIO
 from pathlib import Path
+from subprocess import run
 
 
 # ============================================================
@@ -33,36 +34,33 @@ def main() -> None:
         print('=================================================================')
         print()
 
+        # A single capinfos invocation with all the infos in machine readable format,
+        # parsed straight from stdout without the intermediate .csv file.
+        # The argv list skips the shell entirely (no quoting issues with the pcap path).
+        capinfos = run(['capinfos', '-A', '-TmQ', str(pcap)], capture_output=True, text=True, check=True)
+        infos = pl.read_csv(StringIO(capinfos.stdout)).transpose(include_header=True, header_name='Info', column_names=['Value'])
+
         print("Number of packets  in the capture:")
         print('-----------------------------------------------------------------')
-        system(f'capinfos -c {pcap}')
+        print(infos.filter(pl.col('Info')=='Number of packets'))
         print()
         print()
 
         print('The average data rate in bits/sec:')
         print('-----------------------------------------------------------------')
-        system(f'capinfos -i {pcap}')
+        print(infos.filter(pl.col('Info').str.contains('Data bit rate')))
         print()
         print()
 
         print('The average packet size:')
         print('-----------------------------------------------------------------')
-        system(f'capinfos -z {pcap}')
+        print(infos.filter(pl.col('Info').str.contains('Average packet size')))
         print()
         print()
 
         print('General all infos:')
         print('-----------------------------------------------------------------')
-        system(f'capinfos -A {pcap}')
-        print()
-        print()
-
-        print('Generating a capinfos.csv in the current directory...')
-        capinfos_csv = data_path/'capinfos.csv'
-        system(f'capinfos -TmQ {pcap} > {capinfos_csv}')
-        print('Displaying the csv:')
-        print('-----------------------------------------------------------------')
-        print(pl.read_csv(capinfos_csv).transpose(include_header=True, header_name='Info', column_names=['Value']))
+        print(infos)
 
 
         print('=================================================================')
@@ -8,16 +8,39 @@ from gdown import download
 from tqdm.auto import tqdm
 from py7zr import SevenZipFile
 from dotenv import dotenv_values
+from concurrent.futures import ThreadPoolExecutor
 
 
 # =========================================================
 #                   Needed Functions
 # =========================================================
 
-# Function to unzip the .7z file
+# Function to unzip a single .7z file
+def extract_file(zipped_file: Path,
+                 path: Path) -> None:
+    """
+    Function to extract the contents of a single .7z compressed file.
+
+    Args:
+        -   zipped_file (pathlib.Path): The path of the .7z file to extract.
+        -   path (pathlib.Path): The path of the directory where to extract the contents.
+
+    Return:
+        -   None
+    """
+    with SevenZipFile(zipped_file) as f:
+        f.extractall(path)
+
+    return None
+
+
+# Function to unzip the .7z files
 def extract_pcap(path: Path) -> None:
     """
-    Function to extract the pcap file from a .7z compressed file.
+    Function to extract the pcap file from the .7z compressed files.
+
+    The archives are extracted concurrently: the LZMA decompression releases the GIL,
+    so threads are enough to overlap the decompression of one archive with the disk I/O of another.
 
     Args:
         -   path (pathlib.Path): The path of the directory containing the .7z files.
@@ -25,9 +48,11 @@ def extract_pcap(path: Path) -> None:
     Return:
         -   None
     """
-    for zipped_file in tqdm(list(path.glob("*.7z")), desc='Extracting the 7z files'):
-        with SevenZipFile(zipped_file) as f:
-            f.extractall(path)
+    zipped_files = list(path.glob("*.7z"))
+    with ThreadPoolExecutor() as pool:
+        futures = [pool.submit(extract_file, zipped_file=zipped_file, path=path) for zipped_file in zipped_files]
+        for future in tqdm(futures, desc='Extracting the 7z files'):
+            future.result()
 
     return None
 
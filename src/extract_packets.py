@@ -11,21 +11,32 @@ The .pcap file (one or more) must be saved in the 'data/' directory and the scri
 
 The .jsonl file is going to be saved in the 'data/' directory.
 
-Note: To read the packets sequentially just set n_jobs to 1, by adding '-j 1' or '--jobs 1'.
+Note: The pcap files are read in parallel, one worker process per pcap. To read them sequentially just set the number of workers to 1, by adding '-j 1' or '--jobs 1'.
 """
 
 # Importing the needed libraries
-import pyshark
+import dpkt
 import polars as pl
 from time import time
 from pathlib import Path
+from typing import BinaryIO
 from tqdm.auto import tqdm
 
 from model import Packet
 
-import json
-import jsonlines
-from joblib import Parallel, delayed
+import mmap
+import orjson
+import shutil
+from socket import inet_ntoa
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Number of packets accumulated in memory before flushing them to the .jsonl file
+BUFFER_SIZE = 1000
+
+# The integer columns of a packet: all of them fit in 32 bits, so the .parquet
+# stores them as Int32 instead of the Int64 inferred from the .jsonl
+INT32_COLUMNS = ['dsfield_dscp', 'hdr_len', 'dsfield', 'dsfield_ecn', 'len', 'proto',
+                 'flags_df', 'flags_mf', 'flags_rb', 'frag_offset', 'ttl', 'srcport', 'dstport']
 
 
 
@@ -33,67 +44,118 @@ from joblib import Parallel, delayed
 #                   Needed Functions
 # =========================================================
 
-@delayed
-def read_packet(packet: pyshark.packet,
-                path: Path) -> None:
+def read_packet(timestamp: float,
+                raw: bytes,
+                jsonl: BinaryIO,
+                buffer: list) -> None:
     """Function to read and store the infos of a packet.
 
     Args:
-        - packet (pyshark.packet): A pyshark.packet to query from.
-        - path (pathlib.Path): The path towards the .jsonl file where the function will append the infos.
+        - timestamp (float): The capture timestamp of the packet.
+        - raw (bytes): The raw bytes of the packet, as returned by dpkt.pcap.Reader.
+        - jsonl (typing.BinaryIO): The binary file handle of the .jsonl file where the function will append the infos.
+        - buffer (list): A list where the serialized packets are accumulated before being flushed to the file.
 
     Return:
         - None
     """
+    eth = dpkt.ethernet.Ethernet(raw)
+    ip = eth.data
+
     # We extract the packets only from the IP level
-    if 'IP' in packet:
-        pckt = Packet(dsfield_dscp=packet.ip.dsfield_dscp,
-                      hdr_len=packet.ip.hdr_len,
-                      dsfield=packet.ip.dsfield,
-                      dsfield_ecn=packet.ip.dsfield_ecn,
-                      len=packet.ip.len,
-                      proto=packet.ip.proto,
-                      flags_df=packet.ip.flags_df,
-                      flags_mf=packet.ip.flags_mf,
-                      flags_rb=packet.ip.flags_rb,
-                      frag_offset=packet.ip.frag_offset,
-                      ttl=packet.ip.ttl,
-                      src=packet.ip.src,
-                      dst=packet.ip.dst,
-                      srcport=packet.udp.srcport if 'UDP' in packet else packet.tcp.srcport if 'TCP' in packet else -1,
-                      dstport=packet.udp.dstport if 'UDP' in packet else packet.tcp.dstport if 'TCP' in packet else -1,
-                      sniff_timestamp=packet.sniff_timestamp)
-        
-        # Append the pckt.json() to the .jsonl file
-        with jsonlines.open(path, mode='a') as writer:
-            writer.write(json.loads(pckt.model_dump_json()))
+    if isinstance(ip, dpkt.ip.IP):
+        # The transport layer payload, needed for the ports
+        transport = ip.data
+        has_ports = isinstance(transport, (dpkt.tcp.TCP, dpkt.udp.UDP))
+
+        pckt = Packet(dsfield_dscp=ip.tos >> 2,
+                      hdr_len=ip.hl * 4,
+                      dsfield=ip.tos,
+                      dsfield_ecn=ip.tos & 0x3,
+                      len=ip.len,
+                      proto=ip.p,
+                      flags_df=ip.df,
+                      flags_mf=ip.mf,
+                      flags_rb=ip.rf,
+                      frag_offset=ip.offset * 8,
+                      ttl=ip.ttl,
+                      src=inet_ntoa(ip.src),
+                      dst=inet_ntoa(ip.dst),
+                      srcport=transport.sport if has_ports else -1,
+                      dstport=transport.dport if has_ports else -1,
+                      sniff_timestamp=timestamp)
+
+        # Accumulate the serialized packet in the buffer, flushing it to the .jsonl file once full
+        buffer.append(orjson.dumps(pckt))
+        if len(buffer) >= BUFFER_SIZE:
+            jsonl.write(b'\n'.join(buffer) + b'\n')
+            buffer.clear()
 
     return None
 
 
 def read_pcap(path: Path,
-              save_to: Path,
-              n_jobs: int = -1,
-              verbose: int = 0) -> float:
-    """A function used to read in parallel or in sequential the packets of a pcap.
+              save_to: Path) -> float:
+    """A function used to read sequentially the packets of a pcap.
 
     Args:
         -   path (pathlib.Path):    The path towards the pcap file.
         -   save_to (pathlib.Path): The path where the info are going to be saved.
-        -   n_jobs (int):   Needed for the joblib.Parallel() function, it defines the number of workes used to run a function.
-                            If it is set to -1 then all available workers are used. Default -1.
-        -   verbose (int):  Used by joblib.Parallel() function, used for printing logs of the work status. Default 0.
 
     Return:
         -   float : The required time for reading all the pcap packets.
     """
     start = time()
-    with pyshark.FileCapture(path) as pcap:
-        Parallel(n_jobs=n_jobs, require="sharedmem", verbose=verbose)(read_packet(packet=packet, path=save_to) for packet in pcap)
+    # dpkt parses the IP/TCP/UDP headers in-process: no tshark subprocess, no XML/JSON roundtrip.
+    # The pcap is memory-mapped so the reader pulls the records from the page cache
+    # instead of paying a read syscall per record.
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            pcap = dpkt.pcap.Reader(mapped)
+            # The .jsonl file is opened once per pcap instead of once per packet
+            with open(save_to, 'ab') as jsonl:
+                buffer = []
+                for timestamp, raw in tqdm(pcap, desc=f'Reading the packets of {path.name}'):
+                    read_packet(timestamp=timestamp, raw=raw, jsonl=jsonl, buffer=buffer)
+
+                # Flush the packets left in the buffer
+                if buffer:
+                    jsonl.write(b'\n'.join(buffer) + b'\n')
     end = time()
     return end-start
 
 
+def extract_pcap(path: Path,
+                 data_path: Path) -> tuple:
+    """A function used to extract a whole pcap into its own .jsonl and .parquet files.
+
+    Each pcap gets its own output files, so the workers of the process pool never share a file.
+
+    Args:
+        -   path (pathlib.Path):        The path towards the pcap file.
+        -   data_path (pathlib.Path):   The path of the 'data/' directory where the outputs are saved.
+
+    Return:
+        -   tuple : The path of the .jsonl file of this pcap and the required time for reading all its packets.
+    """
+    jsonl_path = data_path/f'{path.stem}.jsonl'
+    jsonl_path.unlink(missing_ok=True)
+
+    required_time = read_pcap(path=path, save_to=jsonl_path)
+
+    # We save a .parquet copy. The .jsonl is read eagerly: polars 0.18 cannot stream
+    # a scan_ndjson into a parquet sink (sink_parquet panics on non-streamable scans).
+    parquet_path = f'{data_path/path.stem}.parquet'
+    (pl.read_ndjson(jsonl_path)
+     .with_columns([pl.col(column).cast(pl.Int32) for column in INT32_COLUMNS])
+     .write_parquet(parquet_path))
+
+    # Validate the whole pcap in one vectorized pass, instead of checking packet by packet
+    assert not pl.scan_parquet(parquet_path).select((pl.col('flags_rb')!=0).any()).collect().item(), f'flags_rb must be zero for every packet of {path}.'
+
+    return jsonl_path, required_time
+
+
 
 # ============================================================
 #                       Main Loop
@@ -117,13 +179,12 @@ def main() -> None:
 
     The .jsonl file is going to be saved in the 'data/' directory.
 
-    Note: To read the packets sequentially just set n_jobs to 1, by adding '-j 1' or '--jobs 1'.
+    Note: The pcap files are read in parallel, one worker process per pcap. To read them sequentially just set the number of workers to 1, by adding '-j 1' or '--jobs 1'.
     """
 
     # Define the argparse arguments
     parser = argparse.ArgumentParser(description=desc, formatter_class=RawTextHelpFormatter)
-    parser.add_argument('-j', '--jobs', type=int, default=-1, help='Number of workers (it sets the n_jobs of joblib.Parallel()). If set to -1 all available workers are used. Default -1.')
-    parser.add_argument('-v', '--verbose', type=int, default=0, help='Set the verbose variable for joblib.Parallel(). Default 0.')
+    parser.add_argument('-j', '--jobs', type=int, default=-1, help='Number of worker processes. If set to -1 all available workers are used. Default -1.')
     args = parser.parse_args()
    
     # Defines all the needed paths
@@ -149,21 +210,24 @@ def main() -> None:
             case _:
                 raise Exception(f"'{answer}' was not in the options...")
 
-    # Start to read each pcap file
+    # Start to read each pcap file, one worker process per pcap
+    print()
+    partial_paths = []
+    with ProcessPoolExecutor(max_workers=None if args.jobs == -1 else args.jobs) as pool:
+        futures = {pool.submit(extract_pcap, path=pcap_path, data_path=data_path): pcap_path for pcap_path in data_path.glob("*.pcap")}
+        for future in as_completed(futures):
+            partial_path, required_time = future.result()
+            partial_paths.append(partial_path)
+            print(f'Time required for reading all packets of {futures[future]}: {required_time} seconds.')
+
+    # Merge the per-pcap .jsonl files into the final 'pcap.jsonl'
     print()
-    for pcap_path in data_path.glob("*.pcap"):
-        print(f"Reading pcap {pcap_path}...")
-        required_time = read_pcap(path=pcap_path,
-                                  save_to=jsonl_path,
-                                  n_jobs=args.jobs,
-                                  verbose=args.verbose)
-        print()
-        print(f'Time required for reading all packets of {pcap_path}: {required_time} seconds.')
-        print()
-        print()
-
-        # We save a .parquet copy
-        pl.read_ndjson(jsonl_path).write_parquet(f'{data_path/pcap_path.stem}.parquet')
+    print(f"Merging the per-pcap .jsonl files into '{jsonl_path}'...")
+    with open(jsonl_path, 'ab') as jsonl:
+        for partial_path in partial_paths:
+            with open(partial_path, 'rb') as partial:
+                shutil.copyfileobj(partial, jsonl)
+            partial_path.unlink()
 
 
 
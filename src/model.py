@@ -1,16 +1,15 @@
-"""Pydantic model to handle a pyshark.packet.
+"""Dataclass to handle the infos of a packet.
 
-The model convert basically all the entries in integers (beside 'src' and 'dst' which are saved as string, and the 'sniff_timestamp' which is saved as float)
+Basically all the entries are integers (beside 'src' and 'dst' which are saved as string, and the 'sniff_timestamp' which is saved as float).
 
-There are also two validators:
-    - flags_rb_must_be_zero : which check that flags_rb is always equal to 0.
-    - set_dsfield_int16 : which convert the dsfield in a integer base 16.
+Note: The 'flags_rb must be zero' check is not done here per packet, but in bulk over the whole extracted pcap (see extract_packets.extract_pcap).
 """
 
-from pydantic import BaseModel, validator, ValidationError
+from dataclasses import dataclass
 
-# Pydantic class for validatiion of a packet
-class Packet(BaseModel):
+# Dataclass holding the infos of a packet
+@dataclass(slots=True)
+class Packet:
     # Label of DSCP
     dsfield_dscp: int
     # Header Length
@@ -43,15 +42,3 @@ class Packet(BaseModel):
     dstport: int
     # Time
     sniff_timestamp: float
-
-    @validator('flags_rb')
-    def flags_rb_must_be_zero(cls,
-                              v: int) -> int:
-        if v != 0:
-            raise ValidationError('flags_rb must be zero.')
-        return v
-
-    @validator('dsfield', pre=True)
-    def set_dsfield_int16(cls,
-                          v: str) -> int:
-        return int(v, 16)
@@ -6,7 +6,6 @@ This script assumes a 'pcap.parquet' file inside the 'data/' directory.
 import polars as pl
 import seaborn as sns
 from pathlib import Path
-from tqdm.auto import tqdm
 import graph_tool.all as gt
 import matplotlib.pyplot as plt
 
@@ -14,24 +13,49 @@ import matplotlib.pyplot as plt
 #           Needed Functions
 # ========================================
 
-def get_graph(dataframe: pl.DataFrame,
-              protocol: int) -> gt.Graph:
-    """This function create a gt.Graph from a dataframe given a protocol type.
+def get_graph(edges: pl.DataFrame) -> gt.Graph:
+    """This function create a gt.Graph from the edges dataframe of a protocol.
 
     Args:
-        - dataframe (pl.DataFrame): The original polars.DataFrame.
-        - protocol (int): The decimal value corrisponding to a protocol.
+        - edges (pl.DataFrame): The polars.DataFrame with the edges of a single protocol.
 
     Returns:
         -   gt.Graph() : The gt.Graph.
     """
-    edges = (dataframe
-             .lazy()
-             .filter((pl.col('proto')==protocol))
-             .select(pl.col('src'), pl.col('dst'), pl.col('len'))
-             .collect())
+    # to_numpy() hands the edge list to graph-tool as a single array, avoiding the per-row Python tuples of .rows()
+    return gt.Graph(edges.select(pl.col('src'), pl.col('dst'), pl.col('len')).to_numpy(), hashed=True, eprops=[('weight', 'double')])
 
-    return gt.Graph(edges.rows(), hashed=True, eprops=[('weight', 'double')])
+
+def plot_graph(graph: gt.Graph,
+               output: str,
+               style: tuple = None) -> tuple:
+    """This function draws the given gt.Graph, styling the vertices by their betweenness.
+
+    If style is not given the betweenness and the PropertyMaps derived from it are
+    computed here; passing it avoids recomputing them when drawing a GraphView of an
+    already plotted graph (the view shares the vertex index domain of its parent, so
+    the parent's PropertyMaps are valid on it).
+
+    Args:
+        - graph (gt.Graph): The gt.Graph to draw.
+        - output (str): The path of the output file.
+        - style (tuple): The (betweenness, fill color, size) PropertyMaps to style with. If None they are computed from the graph. Default None.
+
+    Returns:
+        - style (tuple) : The (betweenness, fill color, size) PropertyMaps used for the styling.
+    """
+    if style is None:
+        vb, _ = gt.betweenness(graph)
+        style = (vb,
+                 gt.prop_to_size(vb, 0, 1, power=.1),
+                 gt.prop_to_size(vb, 3, 12, power=.2))
+    vb, fill_color, size = style
+    gt.graph_draw(graph,
+                  vertex_fill_color=fill_color,
+                  vertex_size=size,
+                  vorder=vb,
+                  output=output)
+    return style
 
 
 def get_diameter(graph: gt.Graph) -> int:
@@ -44,13 +68,11 @@ def get_diameter(graph: gt.Graph) -> int:
         - diameter (int): The diameter of the given gt.Graph.
     """
     dist = gt.shortest_distance(graph, directed=True)
-    diameter = 0
-    for v in tqdm(graph.vertices(), desc=f'Calculating the diameter'):
-        sh_paths = set(dist[v])
-        sh_paths.remove(2147483647)
-        if (temp:=max(sh_paths)) > diameter:
-            diameter = temp
-    return diameter
+    # Dump the PropertyMap into a numpy matrix once, instead of indexing it vertex by vertex
+    distances = dist.get_2d_array(range(graph.num_vertices()))
+    # The diameter is a single masked reduction: the maximum finite distance
+    # (2147483647 marks the unreachable pairs)
+    return int(distances[distances < 2147483647].max())
 
 
 # ========================================
@@ -76,63 +98,58 @@ def main() -> None:
 
     df = pl.scan_parquet(pcap_path)
 
-    all_edges_df = (df
-                    .groupby(['src', 'dst', 'proto'])
-                    .agg(pl.col('len').sum())
-                    .collect()).with_columns(len=1/pl.col('len')).sort(by='len', descending=True)
+    # The edge list is collected once and cached: both the per-protocol split and the
+    # degree distribution reuse it, so the parquet is scanned and aggregated a single time
+    all_edges = (df
+                 .groupby(['src', 'dst', 'proto'])
+                 .agg(pl.col('len').sum())
+                 .with_columns(len=1/pl.col('len'))
+                 .sort(by='len', descending=True)
+                 .collect())
+
+    # Split the edges by protocol in a single pass, instead of re-filtering the dataframe per graph
+    edges_by_proto = all_edges.partition_by('proto', as_dict=True)
 
     # Plotting the graph for TCP
     print('Plotting the TCP network', end='')
-    tcp_g = get_graph(all_edges_df, protocol=6)
-    vb, eb = gt.betweenness(tcp_g)
-    gt.graph_draw(tcp_g,
-                  vertex_fill_color=gt.prop_to_size(vb, 0, 1, power=.1),
-                  vertex_size=gt.prop_to_size(vb, 3, 12, power=.2),
-                  vorder=vb,
-                  output='tcp_network.pdf')
+    tcp_g = get_graph(edges_by_proto[6])
+    tcp_style = plot_graph(tcp_g, output='tcp_network.pdf')
     print(', done.')
 
 
     # Plotting the largest component for TCP
     print('Plotting the TCP largest component', end='')
     tcp_lc = gt.extract_largest_component(tcp_g)
-    vb, eb = gt.betweenness(tcp_lc)
-    gt.graph_draw(tcp_lc,
-                  vertex_fill_color=gt.prop_to_size(vb, 0, 1, power=.1),
-                  vertex_size=gt.prop_to_size(vb, 3, 12, power=.2),
-                  vorder=vb,
-                  output='tcp_largest_component.pdf')
+    plot_graph(tcp_lc, output='tcp_largest_component.pdf', style=tcp_style)
     print(', done.')
 
     # Plotting the graph for UDP
     print('Plotting the UDP network', end='')
-    udp_g = get_graph(all_edges_df, protocol=17)
-    vb, eb = gt.betweenness(udp_g)
-    gt.graph_draw(udp_g,
-                  vertex_fill_color=gt.prop_to_size(vb, 0, 1, power=.1),
-                  vertex_size=gt.prop_to_size(vb, 3, 12, power=.2),
-                  vorder=vb,
-                  output='udp_network.pdf')
+    udp_g = get_graph(edges_by_proto[17])
+    udp_style = plot_graph(udp_g, output='udp_network.pdf')
     print(', done.')
 
     # Plotting the largest component for UDP
     print('Plotting the UDP largest component', end='')
     udp_lc = gt.extract_largest_component(udp_g)
-    vb, eb = gt.betweenness(udp_lc)
-    gt.graph_draw(udp_lc,
-                  vertex_fill_color=gt.prop_to_size(vb, 0, 1, power=.1),
-                  vertex_size=gt.prop_to_size(vb, 3, 12, power=.2),
-                  vorder=vb,
-                  output='udp_largest_component.pdf')
+    plot_graph(udp_lc, output='udp_largest_component.pdf', style=udp_style)
     print(', done.')
 
     # Degree Distribution plot
     print('Getting the degree distribution', end='')
-    degree_distribution = pl.concat([pl.DataFrame({'Degree': [v.in_degree()+v.out_degree() for v in tcp_g.vertices()],
-                                                   'Protocol': 'TCP'}),
-                                     pl.DataFrame({'Degree': [v.in_degree()+v.out_degree() for v in udp_g.vertices()],
-                                                   'Protocol': 'UDP'})])
-    plot = sns.scatterplot(degree_distribution.groupby(['Protocol', 'Degree']).count().to_pandas(),
+    # The degree of a node is the number of edges it appears in, so the whole
+    # distribution is a couple of group-by counts pushed down into polars
+    degree_distribution = (all_edges
+                           .lazy()
+                           .filter(pl.col('proto').is_in([6, 17]))
+                           .melt(id_vars='proto', value_vars=['src', 'dst'], value_name='node')
+                           .groupby(['proto', 'node'])
+                           .agg(pl.count().alias('Degree'))
+                           .groupby(['proto', 'Degree'])
+                           .agg(pl.count())
+                           .with_columns(Protocol=pl.when(pl.col('proto')==6).then(pl.lit('TCP')).otherwise(pl.lit('UDP')))
+                           .collect())
+    plot = sns.scatterplot(degree_distribution.to_pandas(),
                            x='Degree',
                            y='count',
                            hue='Protocol',